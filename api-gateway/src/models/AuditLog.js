@@ -21,6 +21,14 @@ const AuditLogSchema = new mongoose.Schema({
         type: String,
         required: true
     },
+    statusCode: {
+        type: Number,
+        required: false
+    },
+    requestId: {
+        type: String,
+        required: false
+    },
     ipAddress: {
         type: String,
         required: false
@@ -4,11 +4,12 @@ import cors from 'cors';
 import rateLimit from 'express-rate-limit';
 import compression from 'compression';
 import { v4 as uuidv4 } from 'uuid';
+import mongoose from 'mongoose';
 import { configureEnvironment } from './config/index.js';
 import { connectDB } from './config/database.js';
 import { seedRootAdmin } from './config/seeder.js';
 import { errorHandler } from './middleware/errorHandler.js';
-import { logger, auditLog } from './utils/logger.js';
+import { logger, auditSink } from './utils/logger.js';
 import authRoutes from './routes/authRoutes.js';
 import certificateRoutes from './routes/certificateRoutes.js';
 import draftRoutes from './routes/draftRoutes.js';
@@ -112,6 +113,41 @@ app.use('/api/drafts', draftRoutes);
 app.use(errorHandler);
 
 // 7. Start Server
-app.listen(config.port, () => {
+const server = app.listen(config.port, () => {
     logger.info(`🚀 API Gateway securely running on port ${config.port}`);
 });
+
+// 8. Graceful Shutdown (drain the audit queue before the DB connection closes)
+const SHUTDOWN_TIMEOUT = 10000;
+let shuttingDown = false;
+
+const shutdown = (signal) => {
+    if (shuttingDown) {
+        logger.warn(`⚠️ ${signal} received again during shutdown. Forcing exit.`);
+        process.exit(1);
+    }
+    shuttingDown = true;
+    logger.info(`🛑 ${signal} received. Shutting down API Gateway...`);
+
+    // Hard exit if in-flight requests or a slow audit flush stall the shutdown
+    setTimeout(() => {
+        logger.error(`💥 Graceful shutdown exceeded ${SHUTDOWN_TIMEOUT / 1000}s. Forcing exit.`);
+        process.exit(1);
+    }, SHUTDOWN_TIMEOUT).unref();
+
+    server.close(async () => {
+        try {
+            await auditSink.close();
+            logger.info(`📝 Audit sink flushed: ${JSON.stringify(auditSink.getStats())}`);
+            await mongoose.disconnect();
+            process.exit(0);
+        } catch (error) {
+            logger.error(`💥 Graceful shutdown failed: ${error.message}`);
+            process.exit(1);
+        }
+    });
+    server.closeIdleConnections();
+};
+
+process.on('SIGTERM', () => shutdown('SIGTERM'));
+process.on('SIGINT', () => shutdown('SIGINT'));
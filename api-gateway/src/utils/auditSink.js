@@ -0,0 +1,342 @@
+import fs from 'fs';
+import path from 'path';
+import zlib from 'zlib';
+import { pipeline } from 'stream/promises';
+import mongoose from 'mongoose';
+
+// Precompiled once at module load so redaction is an O(1) lookup per key
+export const SENSITIVE_KEYS = new Set(
+    ['password', 'passwordHash', 'token', 'jwt', 'chaotic_seed', 'dna_payload', 'privateKey', 'AES_KEY', 'x-api-key']
+        .map((key) => key.toLowerCase())
+);
+
+/**
+ * Deep-copy an object, replacing the values of sensitive keys with '[REDACTED]'.
+ * Primitives are returned untouched.
+ */
+export const redact = (obj) => {
+    if (obj == null || typeof obj !== 'object') return obj;
+
+    const newObj = Array.isArray(obj) ? [] : {};
+    for (const [key, value] of Object.entries(obj)) {
+        if (SENSITIVE_KEYS.has(key.toLowerCase())) {
+            newObj[key] = '[REDACTED]';
+        } else if (typeof value === 'object') {
+            newObj[key] = redact(value);
+        } else {
+            newObj[key] = value;
+        }
+    }
+    return newObj;
+};
+
+const readInt = (name, fallback) => {
+    const value = parseInt(process.env[name], 10);
+    return Number.isFinite(value) && value > 0 ? value : fallback;
+};
+
+const AUDIT_FILE_PATTERN = /^audit-(\d{4}-\d{2}-\d{2})\./;
+
+// MongoDB duplicate key error: the record was already stored by an earlier attempt
+const DUPLICATE_KEY = 11000;
+
+const dayOf = (date) => date.toISOString().slice(0, 10);
+
+const formatLine = (record) => {
+    const reqContext = record.requestId ? ` [ReqID: ${record.requestId}]` : '';
+    const ipContext = record.ipAddress ? ` [IP: ${record.ipAddress}]` : '';
+    const uaContext = record.userAgent ? ` [UA: ${record.userAgent}]` : '';
+    return `[${record.createdAt.toISOString()}] AUDIT${reqContext}${ipContext}${uaContext}: EVENT: [${record.action}] ${record.details} | STATUS: ${record.statusCode}\n`;
+};
+
+/**
+ * Bounded, batching audit pipeline.
+ *
+ * Events are redacted once on enqueue and kept in memory until either the
+ * batch size or the flush interval is reached. Each flush echoes the batch to
+ * stdout and appends it to the `audit-YYYY-MM-DD.log` file (UTC) of each
+ * record's day, so callers never wait on disk or database I/O. Audit files
+ * are gzipped once they exceed `maxFileSize` and pruned after `maxFileDays`.
+ *
+ * Flushed records are then handed to a separate persistence chain that
+ * stores them with `insertMany`, so a slow or unreachable MongoDB never
+ * holds up the file trail. Records carry their own `_id`, which makes
+ * retries idempotent. Up to `maxRetrySize` records wait for the database;
+ * beyond that persistence is best-effort and the file trail remains the
+ * record of truth.
+ */
+export class AuditSink {
+    constructor({
+        model,
+        logDir = 'logs',
+        stdout = process.stdout,
+        isConnected = () => mongoose.connection.readyState === 1,
+        batchSize = readInt('AUDIT_BATCH_SIZE', 100),
+        flushIntervalMs = readInt('AUDIT_FLUSH_INTERVAL_MS', 2000),
+        maxQueueSize = readInt('AUDIT_QUEUE_MAX', 10000),
+        maxRetrySize = maxQueueSize,
+        maxFileSize = 100 * 1024 * 1024,
+        maxFileDays = 7,
+        onError = () => {}
+    } = {}) {
+        this.model = model;
+        this.logDir = logDir;
+        this.stdout = stdout;
+        this.isConnected = isConnected;
+        this.batchSize = batchSize;
+        this.flushIntervalMs = flushIntervalMs;
+        this.maxQueueSize = maxQueueSize;
+        this.highWaterMark = Math.floor(maxQueueSize * 0.75);
+        this.maxRetrySize = maxRetrySize;
+        this.maxFileSize = maxFileSize;
+        this.maxFileDays = maxFileDays;
+        this.onError = onError;
+
+        this.queue = [];
+        this.pending = [];
+        this.flushing = null;
+        this.persisting = null;
+        this.flushScheduled = false;
+        this.aboveHighWater = false;
+        this.dropping = false;
+        this.lastPrunedDay = null;
+        this.closed = false;
+        this.stats = {
+            enqueued: 0,
+            dropped: 0,
+            highWaterCrossings: 0,
+            flushes: 0,
+            written: 0,
+            writeFailures: 0,
+            maintenanceFailures: 0,
+            persisted: 0,
+            persistRejected: 0,
+            persistDropped: 0,
+            persistFailures: 0
+        };
+
+        this.timer = setInterval(() => this.flush(), this.flushIntervalMs);
+        // Never keep the process alive just for the audit timer
+        this.timer.unref();
+    }
+
+    /**
+     * Queue an audit record. Returns false when the record was dropped because
+     * the queue is full or the sink has already been closed.
+     */
+    enqueue(record) {
+        if (this.closed || this.queue.length >= this.maxQueueSize) {
+            this.stats.dropped += 1;
+            if (!this.dropping) {
+                this.dropping = true;
+                this.onError(`[Audit Sink] Queue ${this.closed ? 'closed' : `full (${this.maxQueueSize})`}, dropping audit records`);
+            }
+            return false;
+        }
+        this.dropping = false;
+
+        this.queue.push({ ...redact(record), _id: new mongoose.Types.ObjectId(), createdAt: new Date() });
+        this.stats.enqueued += 1;
+
+        if (this.queue.length >= this.highWaterMark && !this.aboveHighWater) {
+            this.aboveHighWater = true;
+            this.stats.highWaterCrossings += 1;
+            this.onError(`[Audit Sink] Queue crossed high-water mark (${this.queue.length}/${this.maxQueueSize})`);
+        }
+        if (this.queue.length >= this.batchSize && !this.flushScheduled) {
+            this.flushScheduled = true;
+            setImmediate(() => {
+                this.flushScheduled = false;
+                this.flush();
+            });
+        }
+        return true;
+    }
+
+    /**
+     * Drain the queue to stdout and the audit file in batches, then hand the
+     * records to the persistence chain without waiting for it. Concurrent
+     * callers share the in-flight flush.
+     */
+    flush() {
+        if (this.flushing) return this.flushing;
+        if (this.queue.length === 0) {
+            this.persist();
+            return Promise.resolve();
+        }
+
+        this.flushing = (async () => {
+            try {
+                while (this.queue.length > 0) {
+                    const batch = this.queue.splice(0, this.batchSize);
+                    if (this.queue.length < this.highWaterMark) this.aboveHighWater = false;
+                    this.echo(batch);
+                    await this.write(batch);
+                    this.defer(batch);
+                    this.stats.flushes += 1;
+                }
+            } finally {
+                this.flushing = null;
+            }
+            this.persist();
+        })();
+        return this.flushing;
+    }
+
+    echo(batch) {
+        if (this.stdout) this.stdout.write(batch.map(formatLine).join(''));
+    }
+
+    /**
+     * Store pending records in MongoDB, one `insertMany` per batch. Each record
+     * is sent at most once per run and the run stops at the first
+     * connection-level failure. Concurrent callers share the in-flight run.
+     */
+    persist() {
+        if (this.persisting) return this.persisting;
+        if (!this.model || this.pending.length === 0 || !this.isConnected()) return Promise.resolve();
+
+        this.persisting = (async () => {
+            try {
+                let remaining = this.pending.length;
+                do {
+                    const records = this.pending.splice(0, Math.min(this.batchSize, remaining));
+                    remaining -= records.length;
+                    if (!(await this.insert(records))) break;
+                } while (remaining > 0 && this.pending.length > 0 && this.isConnected());
+            } finally {
+                this.persisting = null;
+            }
+        })();
+        return this.persisting;
+    }
+
+    /**
+     * Insert one batch. Returns false when the database could not be reached,
+     * in which case the batch is put back at the head of the pending list.
+     */
+    async insert(records) {
+        try {
+            const inserted = await this.model.insertMany(records, { ordered: false });
+            this.stats.persisted += inserted.length;
+            this.stats.persistRejected += records.length - inserted.length;
+            return true;
+        } catch (error) {
+            this.stats.persistFailures += 1;
+
+            if (!error.writeErrors) {
+                // The batch may or may not have reached the server; the fixed _ids make a retry safe
+                this.defer(records, true);
+                this.onError(`[Audit Sink] Failed to persist ${records.length} audit records, will retry: ${error.message}`);
+                return false;
+            }
+
+            const duplicates = error.writeErrors.filter((writeError) => writeError.code === DUPLICATE_KEY).length;
+            const inserted = error.insertedDocs ? error.insertedDocs.length : records.length - error.writeErrors.length;
+            const rejected = records.length - inserted - duplicates;
+            this.stats.persisted += inserted + duplicates;
+            this.stats.persistRejected += rejected;
+            if (rejected > 0) {
+                this.onError(`[Audit Sink] MongoDB rejected ${rejected} audit records: ${error.message}`);
+            }
+            return true;
+        }
+    }
+
+    /**
+     * Add records to the pending list, dropping whatever exceeds `maxRetrySize`.
+     */
+    defer(records, first = false) {
+        const kept = records.slice(0, Math.max(this.maxRetrySize - this.pending.length, 0));
+        if (first) {
+            this.pending.unshift(...kept);
+        } else {
+            this.pending.push(...kept);
+        }
+        this.stats.persistDropped += records.length - kept.length;
+    }
+
+    async write(batch) {
+        const linesByDay = new Map();
+        for (const record of batch) {
+            const day = dayOf(record.createdAt);
+            if (!linesByDay.has(day)) linesByDay.set(day, []);
+            linesByDay.get(day).push(formatLine(record));
+        }
+
+        for (const [day, lines] of linesByDay) {
+            const file = path.join(this.logDir, `audit-${day}.log`);
+            try {
+                await fs.promises.mkdir(this.logDir, { recursive: true });
+                await fs.promises.appendFile(file, lines.join(''));
+                this.stats.written += lines.length;
+            } catch (error) {
+                this.stats.writeFailures += 1;
+                this.onError(`[Audit Sink] Failed to write ${lines.length} audit records to ${file}: ${error.message}`);
+                continue;
+            }
+
+            try {
+                const { size } = await fs.promises.stat(file);
+                if (size >= this.maxFileSize) await this.rotate(file, day);
+            } catch (error) {
+                this.stats.maintenanceFailures += 1;
+                this.onError(`[Audit Sink] Failed to rotate ${file}: ${error.message}`);
+            }
+        }
+
+        try {
+            await this.prune(dayOf(batch[batch.length - 1].createdAt));
+        } catch (error) {
+            this.stats.maintenanceFailures += 1;
+            this.onError(`[Audit Sink] Failed to prune audit files in ${this.logDir}: ${error.message}`);
+        }
+    }
+
+    /**
+     * Gzip a full audit file into the next numbered archive for its day.
+     */
+    async rotate(file, day) {
+        const files = await fs.promises.readdir(this.logDir);
+        const index = files.filter((name) => name.startsWith(`audit-${day}.`) && name.endsWith('.log.gz')).length + 1;
+        const archive = path.join(this.logDir, `audit-${day}.${index}.log.gz`);
+        await pipeline(fs.createReadStream(file), zlib.createGzip(), fs.createWriteStream(archive));
+        await fs.promises.unlink(file);
+    }
+
+    /**
+     * Remove audit files and archives older than `maxFileDays`. Runs once per day.
+     */
+    async prune(today) {
+        if (this.lastPrunedDay === today) return;
+
+        const cutoff = new Date(`${today}T00:00:00Z`);
+        cutoff.setUTCDate(cutoff.getUTCDate() - this.maxFileDays);
+        const cutoffDay = dayOf(cutoff);
+
+        for (const name of await fs.promises.readdir(this.logDir)) {
+            const match = AUDIT_FILE_PATTERN.exec(name);
+            if (match && match[1] <= cutoffDay) {
+                await fs.promises.unlink(path.join(this.logDir, name));
+            }
+        }
+        this.lastPrunedDay = today;
+    }
+
+    getStats() {
+        return { ...this.stats, queued: this.queue.length, pendingPersist: this.pending.length };
+    }
+
+    /**
+     * Stop accepting records, write everything still queued and make one last
+     * attempt to persist it.
+     */
+    async close() {
+        this.closed = true;
+        clearInterval(this.timer);
+        await this.flush();
+        // A run already in flight only covers the records it started with
+        await this.persisting;
+        await this.persist();
+    }
+}
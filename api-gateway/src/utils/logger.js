@@ -1,29 +1,12 @@
 import winston from 'winston';
 import DailyRotateFile from 'winston-daily-rotate-file';
+import AuditLog from '../models/AuditLog.js';
+import { AuditSink, redact } from './auditSink.js';
 
 // Custom format to completely redact sensitive information before it hits logs
 const redactSensitive = winston.format((info) => {
-    const sensitiveKeys = ['password', 'passwordHash', 'token', 'jwt', 'chaotic_seed', 'dna_payload', 'privateKey', 'AES_KEY', 'x-api-key'];
-
-    const censor = (obj) => {
-        if (obj == null) return obj;
-        if (typeof obj !== 'object') return obj;
-
-        const newObj = Array.isArray(obj) ? [] : {};
-        for (const [key, value] of Object.entries(obj)) {
-            if (sensitiveKeys.includes(key.toLowerCase()) || sensitiveKeys.includes(key)) {
-                newObj[key] = '[REDACTED]';
-            } else if (typeof value === 'object') {
-                newObj[key] = censor(value);
-            } else {
-                newObj[key] = value;
-            }
-        }
-        return newObj;
-    };
-
-    info.message = typeof info.message === 'object' ? censor(info.message) : info.message;
-    if (info.meta) info.meta = censor(info.meta);
+    info.message = typeof info.message === 'object' ? redact(info.message) : info.message;
+    if (info.meta) info.meta = redact(info.meta);
     return info;
 });
 
@@ -51,9 +34,9 @@ const errorRotateTransport = new DailyRotateFile({
     level: 'error'
 });
 
-// Specific transport for Audit Trail (Auth, Certificates)
-const auditRotateTransport = new DailyRotateFile({
-    filename: 'logs/audit-%DATE%.log',
+// General application trail; audit events are written to logs/audit-YYYY-MM-DD.log by the audit sink
+const appRotateTransport = new DailyRotateFile({
+    filename: 'logs/app-%DATE%.log',
     datePattern: 'YYYY-MM-DD',
     zippedArchive: true,
     maxSize: '100m',
@@ -66,7 +49,7 @@ export const logger = winston.createLogger({
     format: logFormat,
     transports: [
         errorRotateTransport,
-        auditRotateTransport,
+        appRotateTransport,
         new winston.transports.Console({
             format: winston.format.combine(
                 winston.format.colorize(),
@@ -76,6 +59,19 @@ export const logger = winston.createLogger({
     ]
 });
 
+// Audit events bypass winston and are batched to stdout, MongoDB and the audit file off the request path
+export const auditSink = new AuditSink({
+    model: AuditLog,
+    onError: (message) => logger.error(message)
+});
+
 export const auditLog = (event, requestId, res_status, message, ip, userAgent) => {
-    logger.info(`EVENT: [${event}] ${message} | STATUS: ${res_status}`, { requestId, ip, userAgent });
+    auditSink.enqueue({
+        action: event,
+        details: message,
+        statusCode: res_status,
+        requestId,
+        ipAddress: ip,
+        userAgent
+    });
 };
@@ -0,0 +1,218 @@
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { AuditSink, redact } from '../src/utils/auditSink.js';
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const record = (i) => ({ action: 'CERT_VERIFY_SUCCESS', details: `Event ${i}`, statusCode: 200, requestId: `req-${i}` });
+
+describe('AuditSink', () => {
+    let logDir;
+    let inserted;
+    let sink;
+
+    const createSink = (options = {}) => {
+        sink = new AuditSink({
+            model: {
+                insertMany: async (docs) => {
+                    inserted.push(docs.length);
+                    return docs;
+                }
+            },
+            logDir,
+            stdout: null,
+            isConnected: () => true,
+            batchSize: 3,
+            flushIntervalMs: 60000,
+            maxQueueSize: 10,
+            ...options
+        });
+        return sink;
+    };
+
+    beforeEach(() => {
+        logDir = fs.mkdtempSync(path.join(os.tmpdir(), 'audit-sink-'));
+        inserted = [];
+    });
+
+    afterEach(async () => {
+        await sink.close();
+        fs.rmSync(logDir, { recursive: true, force: true });
+    });
+
+    test('flushes once the batch size is reached', async () => {
+        createSink();
+        sink.enqueue(record(1));
+        sink.enqueue(record(2));
+        await sleep(50);
+        expect(inserted).toEqual([]);
+
+        sink.enqueue(record(3));
+        await sleep(50);
+        expect(inserted).toEqual([3]);
+        expect(sink.getStats()).toMatchObject({ persisted: 3, written: 3, queued: 0 });
+    });
+
+    test('flushes a partial batch on the interval', async () => {
+        createSink({ flushIntervalMs: 20 });
+        sink.enqueue(record(1));
+        await sleep(60);
+        expect(inserted).toEqual([1]);
+    });
+
+    test('concurrent flush() calls share one in-flight flush', async () => {
+        createSink();
+        sink.enqueue(record(1));
+        const first = sink.flush();
+        const second = sink.flush();
+        expect(second).toBe(first);
+        await first;
+        await sink.persist();
+        expect(inserted).toEqual([1]);
+    });
+
+    test('close() drains the queue and rejects new records', async () => {
+        createSink();
+        sink.enqueue(record(1));
+        sink.enqueue(record(2));
+        await sink.close();
+
+        expect(inserted).toEqual([2]);
+        expect(sink.enqueue(record(3))).toBe(false);
+        expect(sink.getStats()).toMatchObject({ queued: 0, dropped: 1 });
+    });
+
+    test('counts drops once the queue is full', () => {
+        const warnings = [];
+        createSink({ batchSize: 100, maxQueueSize: 4, onError: (message) => warnings.push(message) });
+        for (let i = 0; i < 6; i++) sink.enqueue(record(i));
+
+        expect(sink.getStats()).toMatchObject({ enqueued: 4, dropped: 2, highWaterCrossings: 1, queued: 4 });
+        expect(warnings).toHaveLength(2);
+    });
+
+    test('re-queues records while the database is unavailable', async () => {
+        let connected = false;
+        createSink({ isConnected: () => connected });
+        sink.enqueue(record(1));
+        await sink.flush();
+        expect(sink.getStats()).toMatchObject({ persisted: 0, pendingPersist: 1, written: 1 });
+
+        connected = true;
+        await sink.persist();
+        expect(inserted).toEqual([1]);
+        expect(sink.getStats()).toMatchObject({ persisted: 1, pendingPersist: 0 });
+    });
+
+    test('re-queues a batch with the same _ids when insertMany throws', async () => {
+        const attempts = [];
+        createSink({
+            model: {
+                insertMany: async (docs) => {
+                    attempts.push(docs.map((doc) => doc._id.toString()));
+                    throw new Error('Server selection timed out');
+                }
+            }
+        });
+        for (let i = 0; i < 7; i++) sink.enqueue(record(i));
+        await sink.flush();
+        await sink.persist();
+
+        // Stops after the first connection-level failure
+        expect(attempts).toHaveLength(1);
+        expect(sink.getStats()).toMatchObject({ persisted: 0, pendingPersist: 7, persistDropped: 0, persistFailures: 1, written: 7 });
+        expect(fs.readFileSync(path.join(logDir, fs.readdirSync(logDir)[0]), 'utf8').split('\n')).toHaveLength(8);
+
+        await sink.flush();
+        await sink.persist();
+        expect(attempts).toHaveLength(2);
+        expect(attempts[1]).toEqual(attempts[0]);
+    });
+
+    test('counts duplicates as persisted and rejected documents as lost on a bulk error', async () => {
+        createSink({
+            model: {
+                insertMany: async (docs) => {
+                    const error = new Error('E11000 duplicate key error');
+                    error.insertedDocs = docs.slice(0, 1);
+                    error.writeErrors = [{ code: 11000 }, { code: 121 }];
+                    throw error;
+                }
+            }
+        });
+        for (let i = 0; i < 3; i++) sink.enqueue(record(i));
+        await sink.flush();
+        await sink.persist();
+
+        expect(sink.getStats()).toMatchObject({ persisted: 2, persistRejected: 1, pendingPersist: 0, persistFailures: 1, written: 3 });
+    });
+
+    test('drops records beyond the retry limit', async () => {
+        createSink({ isConnected: () => false, maxRetrySize: 2 });
+        for (let i = 0; i < 3; i++) sink.enqueue(record(i));
+        await sink.flush();
+
+        expect(sink.getStats()).toMatchObject({ pendingPersist: 2, persistDropped: 1, written: 3 });
+    });
+
+    test('writes the audit file without waiting on a slow database', async () => {
+        let release;
+        const gate = new Promise((resolve) => { release = resolve; });
+        createSink({
+            model: {
+                insertMany: async (docs) => {
+                    await gate;
+                    inserted.push(docs.length);
+                    return docs;
+                }
+            }
+        });
+        sink.enqueue(record(1));
+        await sink.flush();
+
+        expect(sink.getStats()).toMatchObject({ written: 1, persisted: 0 });
+        expect(inserted).toEqual([]);
+
+        release();
+        await sink.persist();
+        expect(inserted).toEqual([1]);
+    });
+
+    test('writes each record to the file of its own day', async () => {
+        createSink();
+        await sink.write([
+            { ...record(1), createdAt: new Date('2026-01-01T23:59:59Z') },
+            { ...record(2), createdAt: new Date('2026-01-02T00:00:01Z') }
+        ]);
+
+        expect(fs.readFileSync(path.join(logDir, 'audit-2026-01-01.log'), 'utf8')).toContain('Event 1');
+        expect(fs.readFileSync(path.join(logDir, 'audit-2026-01-02.log'), 'utf8')).toContain('Event 2');
+    });
+
+    test('gzips full files and prunes expired days', async () => {
+        createSink({ maxFileSize: 10, maxFileDays: 7 });
+        fs.writeFileSync(path.join(logDir, 'audit-2026-01-01.log'), 'expired\n');
+        await sink.write([{ ...record(1), createdAt: new Date('2026-01-08T12:00:00Z') }]);
+
+        expect(fs.readdirSync(logDir).sort()).toEqual(['audit-2026-01-08.1.log.gz']);
+    });
+});
+
+describe('redact', () => {
+    test('censors sensitive keys regardless of case', () => {
+        const result = redact({
+            passwordHash: 'hash',
+            privateKey: 'key',
+            AES_KEY: 'aes',
+            nested: { Token: 'jwt', keep: 'visible' }
+        });
+
+        expect(result).toEqual({
+            passwordHash: '[REDACTED]',
+            privateKey: '[REDACTED]',
+            AES_KEY: '[REDACTED]',
+            nested: { Token: '[REDACTED]', keep: 'visible' }
+        });
+    });
+});